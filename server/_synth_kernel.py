@@ -0,0 +1,59 @@
+import numpy as np
+from numba import get_num_threads, njit, prange
+
+# Direct digital synthesis: a 32-bit phase accumulator indexes a shared sine
+# wavetable. The top LUT_BITS of the phase select the entry and the remaining
+# bits interpolate linearly towards the next one.
+LUT_BITS = 14
+LUT_SIZE = 1 << LUT_BITS
+PHASE_BITS = 32
+FRAC_BITS = PHASE_BITS - LUT_BITS
+
+# Samples per tile of the output buffer (32 KiB of float32)
+BLOCK_SIZE = 8192
+
+# One guard entry so idx + 1 never needs wrapping
+SINE_LUT = np.sin(2 * np.pi * np.arange(LUT_SIZE + 1) / LUT_SIZE).astype(np.float32)
+
+
+def phase_increments(freqs, sr):
+    """Per-sample 32-bit phase step for each frequency."""
+    return (np.asarray(freqs, dtype=np.float64) / sr * (1 << PHASE_BITS)).astype(np.int64) & 0xFFFFFFFF
+
+
+def parallel_span():
+    """Samples that give every Numba worker one full tile."""
+    return BLOCK_SIZE * get_num_threads()
+
+
+def additive(incs, amps, lut, offset, n, out):
+    """Add wavetable sines with the given phase increments and amplitudes onto out[:n].
+
+    out[0] is sample number offset of the stream, which sets each tone's phase.
+    """
+    # Spans shorter than one tile per worker use smaller blocks so no
+    # worker sits idle
+    workers = get_num_threads()
+    block = max(1, min(BLOCK_SIZE, -(-n // workers)))
+    _additive(incs, amps, lut, offset, n, block, out)
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _additive(incs, amps, lut, offset, n, block, out):
+    frac_mask = (1 << FRAC_BITS) - 1
+    frac_scale = 1.0 / (1 << FRAC_BITS)
+    n_blocks = (n + block - 1) // block
+    # Each worker owns a cache-sized block of samples and walks every
+    # frequency over it, so the partial sums stay in L1/L2
+    for b in prange(n_blocks):
+        start = b * block
+        stop = min(start + block, n)
+        for j in range(incs.size):
+            inc = incs[j]
+            amp = amps[j]
+            phase = ((offset + start) * inc) & 0xFFFFFFFF
+            for i in range(start, stop):
+                idx = phase >> FRAC_BITS
+                frac = (phase & frac_mask) * frac_scale
+                out[i] += amp * (lut[idx] + frac * (lut[idx + 1] - lut[idx]))
+                phase = (phase + inc) & 0xFFFFFFFF
@@ -1,11 +1,16 @@
 #!/usr/bin/env python3
 import os
+import math
+import numbers
 import sys
-import json
-import pandas as pd
+import orjson
+import shutil
+import hashlib
+import subprocess
 import numpy as np
+import openpyxl
 from pydub import AudioSegment
-from pydub.generators import Sine
+from python_calamine import CalamineWorkbook
 import datetime
 import uuid
 import logging
@@ -22,34 +27,92 @@ class Config:
     SAMPLE_RATE = 96000  # Hz
     BIT_RATE = "192k"    # Quality
     REQUIRED_EXCEL_COLUMN = "THz"
+    CACHE_DIR = "cache"
+    CACHE_MAX_FILES = 64   # rendered MP3s kept, least recently used evicted
+    STREAM_CHUNK_MS = 200  # PCM synthesized per encoder write
 
 class NeuroAudioGenerator:
     def __init__(self):
-        self.audio_segment = AudioSegment.silent(
-            duration=Config.TOTAL_DURATION_SECONDS * 1000,
-            frame_rate=Config.SAMPLE_RATE
+        # Distinct tones in the mix and how many inputs map to each; samples
+        # are only synthesized while streaming to the encoder
+        self.n_samples = Config.SAMPLE_RATE * Config.TOTAL_DURATION_SECONDS
+        self.tone_freqs = np.empty(0, dtype=np.float64)
+        self.tone_counts = np.empty(0, dtype=np.float64)
+        self.tone_count = 0
+        # count/min/max/mean/std of the valid THz inputs
+        self.stats = None
+
+    def cache_key(self) -> str:
+        """Content hash of the normalized tone set and the settings that shape the audio."""
+        # The rendered audio only depends on which tones are mixed and their
+        # relative weights, not on the raw THz values that produced them
+        weights = self.tone_counts / max(self.tone_count, 1)
+        settings = (
+            Config.TOTAL_DURATION_SECONDS,
+            Config.DEFAULT_VOLUME,
+            Config.SAMPLE_RATE,
+            Config.BIT_RATE
         )
+        digest = hashlib.blake2b(self.tone_freqs.astype('<f8').tobytes())
+        digest.update(weights.astype('<f8').tobytes())
+        digest.update(repr(settings).encode())
+        return digest.hexdigest()
 
     @staticmethod
-    def thz_to_hz(thz: float) -> float:
-        """Convert Terahertz to Hertz with validation."""
-        if not isinstance(thz, (int, float)) or np.isnan(thz):
-            raise ValueError(f"Invalid frequency value: {thz}")
-        return thz * 1e12
-
-    def generate_tone(self, frequency_hz: float, duration_ms: int) -> AudioSegment:
-        """Generate a sine tone at specified frequency."""
-        try:
-            # Clamp frequency to audible range for processing
-            freq = min(max(frequency_hz, Config.MIN_FREQUENCY_HZ), Config.MAX_FREQUENCY_HZ)
-            tone = Sine(freq, sample_rate=Config.SAMPLE_RATE).to_audio_segment(
-                duration=duration_ms,
-                volume=Config.DEFAULT_VOLUME
+    def prune_cache() -> None:
+        """Evict the least recently used renders beyond CACHE_MAX_FILES."""
+        entries = [
+            os.path.join(Config.CACHE_DIR, name)
+            for name in os.listdir(Config.CACHE_DIR) if name.endswith('.mp3')
+        ]
+        entries.sort(key=os.path.getmtime, reverse=True)
+        for path in entries[Config.CACHE_MAX_FILES:]:
+            os.remove(path)
+
+    @staticmethod
+    def _column_index(header: list) -> int:
+        """Position of the THz column in a header row."""
+        header = [str(cell) for cell in header]
+        
+        if Config.REQUIRED_EXCEL_COLUMN not in header:
+            raise ValueError(
+                f"Column '{Config.REQUIRED_EXCEL_COLUMN}' not found. "
+                f"Available columns: {', '.join(header)}"
             )
-            return tone
-        except Exception as e:
-            logger.error(f"Error generating tone at {frequency_hz}Hz: {e}")
-            raise
+        
+        return header.index(Config.REQUIRED_EXCEL_COLUMN)
+
+    @staticmethod
+    def _is_number(value) -> bool:
+        """True for real numbers, including NumPy scalars; booleans are not frequencies."""
+        return isinstance(value, numbers.Real) and not isinstance(value, bool)
+
+    @staticmethod
+    def _numeric_cells(rows, col: int) -> np.ndarray:
+        """Numeric values of one column, skipping blank and text cells."""
+        return np.fromiter(
+            (row[col] for row in rows
+             if col < len(row) and NeuroAudioGenerator._is_number(row[col])),
+            dtype=np.float64
+        )
+
+    @staticmethod
+    def _read_column_calamine(excel_path: str) -> np.ndarray:
+        """Read the numeric cells of the THz column from the first sheet."""
+        rows = CalamineWorkbook.from_path(excel_path).get_sheet_by_index(0).to_python()
+        col = NeuroAudioGenerator._column_index(rows[0] if rows else [])
+        return NeuroAudioGenerator._numeric_cells(rows[1:], col)
+
+    @staticmethod
+    def _read_column_openpyxl(excel_path: str) -> np.ndarray:
+        """Read the THz column from the first sheet in openpyxl's streaming mode."""
+        wb = openpyxl.load_workbook(excel_path, read_only=True, data_only=True)
+        try:
+            rows = wb.worksheets[0].iter_rows(values_only=True)
+            col = NeuroAudioGenerator._column_index(next(rows, ()))
+            return NeuroAudioGenerator._numeric_cells(rows, col)
+        finally:
+            wb.close()
 
     @staticmethod
     def load_frequencies(excel_path: str) -> np.ndarray:
@@ -60,22 +123,16 @@ class NeuroAudioGenerator:
             if not os.path.exists(excel_path):
                 raise FileNotFoundError(f"File not found: {excel_path}")
 
-            # Try reading with openpyxl first, then xlrd
-            engines = ['openpyxl', 'xlrd']
+            # Try reading with calamine first, then fall back to openpyxl
+            engines = ['calamine', 'openpyxl']
             last_error = None
             
             for engine in engines:
                 try:
-                    df = pd.read_excel(excel_path, engine=engine)
-                    
-                    if Config.REQUIRED_EXCEL_COLUMN not in df.columns:
-                        available_cols = ", ".join(df.columns)
-                        raise ValueError(
-                            f"Column '{Config.REQUIRED_EXCEL_COLUMN}' not found. "
-                            f"Available columns: {available_cols}"
-                        )
-                    
-                    freqs = df[Config.REQUIRED_EXCEL_COLUMN].dropna().values
+                    if engine == 'calamine':
+                        freqs = NeuroAudioGenerator._read_column_calamine(excel_path)
+                    else:
+                        freqs = NeuroAudioGenerator._read_column_openpyxl(excel_path)
                     
                     if len(freqs) == 0:
                         raise ValueError("No frequencies found in THz column")
@@ -93,44 +150,186 @@ class NeuroAudioGenerator:
             logger.error(f"Error loading frequencies: {e}")
             raise
 
-    def add_frequencies(self, frequencies_thz: list) -> None:
+    @staticmethod
+    def _merge_stats(a: dict, b: dict) -> dict:
+        """Combine count/min/max/mean/std of two batches of frequencies."""
+        if a is None:
+            return b
+        count = a['count'] + b['count']
+        delta = b['mean'] - a['mean']
+        mean = a['mean'] + delta * b['count'] / count
+        m2 = (a['std'] ** 2 * a['count'] + b['std'] ** 2 * b['count']
+              + delta ** 2 * a['count'] * b['count'] / count)
+        return {
+            'count': count,
+            'min': min(a['min'], b['min']),
+            'max': max(a['max'], b['max']),
+            'mean': mean,
+            'std': (m2 / count) ** 0.5
+        }
+
+    def add_frequencies(self, frequencies_thz: np.ndarray) -> None:
         """Add multiple frequencies to audio mix."""
         total = len(frequencies_thz)
         logger.info(f"Processing {total} frequencies...")
-        
-        for i, thz in enumerate(frequencies_thz, 1):
-            try:
-                hz = self.thz_to_hz(thz)
-                tone = self.generate_tone(hz, Config.TOTAL_DURATION_SECONDS * 1000)
-                self.audio_segment = self.audio_segment.overlay(tone)
-                
-                if i % 100 == 0 or i == total:
-                    logger.info(f"Progress: {i}/{total} frequencies processed")
-                    
-            except Exception as e:
-                logger.warning(f"Error processing frequency {thz}THz (skipped): {e}")
-                continue
+
+        # Validate and convert the whole column at once
+        freqs = np.asarray(frequencies_thz)
+        if freqs.dtype.kind not in 'iuf':
+            # Mixed column: anything that is not a number becomes NaN
+            freqs = np.fromiter(
+                (f if self._is_number(f) else np.nan for f in frequencies_thz),
+                dtype=np.float64,
+                count=total
+            )
+        thz = freqs.astype(np.float64)
+        thz = thz[~np.isnan(thz)]
+
+        skipped = total - len(thz)
+        if skipped:
+            logger.warning(f"Skipped {skipped} invalid frequency values")
+
+        if len(thz) == 0:
+            logger.warning("No valid frequencies to synthesize")
+            return
+
+        # Input statistics while the THz values are at hand, so callers
+        # don't need another pass over the column
+        self.stats = self._merge_stats(self.stats, {
+            'count': len(thz),
+            'min': float(thz.min()),
+            'max': float(thz.max()),
+            'mean': float(thz.mean()),
+            'std': float(thz.std())
+        })
+
+        # Clamp to audible range for processing
+        freqs = thz * 1e12
+        np.clip(freqs, Config.MIN_FREQUENCY_HZ, Config.MAX_FREQUENCY_HZ, out=freqs)
+
+        # Identical tones (e.g. everything clamped to the same bound) are
+        # synthesized once with their multiplicity as amplitude
+        unique_freqs, counts = np.unique(np.round(freqs, 2), return_counts=True)
+
+        # Merge with tones from earlier calls
+        self.tone_freqs, inverse = np.unique(
+            np.concatenate([self.tone_freqs, unique_freqs]), return_inverse=True
+        )
+        self.tone_counts = np.bincount(
+            inverse, weights=np.concatenate([self.tone_counts, counts])
+        )
+        self.tone_count += len(freqs)
+        logger.info(f"{total} frequencies -> {len(self.tone_freqs)} distinct tones")
+
+    def period_samples(self) -> int:
+        """Shortest whole-second period of the mix in samples, 0 if it does not repeat."""
+        # A sum of tones repeats after q seconds when every tone completes a
+        # whole number of cycles in q seconds; it must repeat at least twice
+        for seconds in range(1, Config.TOTAL_DURATION_SECONDS // 2 + 1):
+            cycles = self.tone_freqs * seconds
+            if np.allclose(cycles, np.round(cycles), rtol=0, atol=1e-6):
+                return seconds * Config.SAMPLE_RATE
+        return 0
+
+    def _single_tone(self, gain: float):
+        """One PCM period of the mix if it is a single whole-Hz tone, else None."""
+        if len(self.tone_freqs) != 1 or self.tone_freqs[0] != round(self.tone_freqs[0]):
+            return None
+        freq = int(self.tone_freqs[0])
+        # An f Hz tone repeats every SAMPLE_RATE / gcd(f, SAMPLE_RATE) samples
+        period_len = Config.SAMPLE_RATE // math.gcd(freq, Config.SAMPLE_RATE)
+        t = np.arange(period_len) / Config.SAMPLE_RATE
+        tone = np.sin(2 * np.pi * freq * t) * (gain * self.tone_counts[0])
+        return np.clip(tone, -32768, 32767).astype(np.int16)
+
+    def synth_chunks(self, chunk_ms: int = Config.STREAM_CHUNK_MS):
+        """Yield the mix as consecutive 16-bit PCM chunks at the configured volume."""
+        chunk_len = Config.SAMPLE_RATE * chunk_ms // 1000
+        # Normalize the mix so the summed tones sit at the configured volume
+        gain = 10 ** (Config.DEFAULT_VOLUME / 20) / max(self.tone_count, 1) * 32767
+
+        # Common case: every input clamps to the same bound, so the mix is a
+        # single tone and one exact period of it is enough
+        period = self._single_tone(gain)
+
+        if period is None:
+            # Only real mixes need the Numba kernel; importing it is a
+            # noticeable part of a CLI run's startup
+            from _synth_kernel import SINE_LUT, additive, parallel_span, phase_increments
+            incs = phase_increments(self.tone_freqs, Config.SAMPLE_RATE)
+            amps = self.tone_counts.astype(np.float32)
+            
+            period_len = self.period_samples()
+            if period_len:
+                # The mix repeats: synthesize one period and replay it
+                period = np.zeros(period_len, dtype=np.float32)
+                additive(incs, amps, SINE_LUT, 0, period_len, period)
+                period = np.clip(period * gain, -32768, 32767).astype(np.int16)
+
+        if period is not None:
+            for start in range(0, self.n_samples, chunk_len):
+                n = min(chunk_len, self.n_samples - start)
+                yield period.take(np.arange(start, start + n) % len(period))
+            return
+
+        # Round the chunk up to one tile per Numba worker so every kernel
+        # call keeps all cores busy
+        span = parallel_span()
+        chunk_len = -(-chunk_len // span) * span
+        buf = np.empty(chunk_len, dtype=np.float32)
+
+        for start in range(0, self.n_samples, chunk_len):
+            n = min(chunk_len, self.n_samples - start)
+            buf[:n] = 0
+            # Additive synthesis: the phase of every tone is derived from the
+            # absolute sample index, so chunks join without discontinuities
+            additive(incs, amps, SINE_LUT, start, n, buf)
+            buf[:n] *= gain
+            yield np.clip(buf[:n], -32768, 32767).astype(np.int16)
 
     def save_audio(self, output_path: str) -> None:
         """Save audio file as MP3."""
         try:
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
             
-            if len(self.audio_segment) == 0:
+            if len(self.tone_freqs) == 0:
                 raise ValueError("No audio data to export")
             
             logger.info(f"Exporting audio to: {output_path}")
             
-            self.audio_segment.export(
-                output_path,
-                format="mp3",
-                bitrate=Config.BIT_RATE,
-                tags={
-                    'title': 'NeuroAudio',
-                    'artist': 'NeuroAudio System',
-                    'comment': 'Generated automatically'
-                }
-            )
+            # Stream raw PCM into the encoder while it is being synthesized,
+            # no intermediate WAV and no full-length buffer
+            command = [
+                AudioSegment.converter, '-hide_banner', '-loglevel', 'error', '-y',
+                '-f', 's16le', '-ar', str(Config.SAMPLE_RATE), '-ac', '1', '-i', 'pipe:0',
+                '-f', 'mp3', '-b:a', Config.BIT_RATE,
+                '-metadata', 'title=NeuroAudio',
+                '-metadata', 'artist=NeuroAudio System',
+                '-metadata', 'comment=Generated automatically',
+                output_path
+            ]
+            encoder = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+            encoded = False
+            try:
+                try:
+                    for chunk in self.synth_chunks():
+                        encoder.stdin.write(chunk.tobytes())
+                except BrokenPipeError:
+                    # Encoder exited early; its stderr explains why
+                    pass
+                _, stderr = encoder.communicate()
+                
+                if encoder.returncode != 0:
+                    raise RuntimeError(f"MP3 encoding failed: {stderr.decode(errors='replace').strip()}")
+                encoded = True
+            finally:
+                if not encoded:
+                    # Don't leave the encoder running or a truncated MP3 behind
+                    if encoder.poll() is None:
+                        encoder.kill()
+                    encoder.communicate()
+                    if os.path.exists(output_path):
+                        os.remove(output_path)
             
             if not os.path.exists(output_path):
                 raise RuntimeError(f"Audio file was not created: {output_path}")
@@ -141,6 +340,11 @@ class NeuroAudioGenerator:
             logger.error(f"Failed to save audio: {e}")
             raise
 
+def write_result(result: dict) -> None:
+    """Write the JSON result line that the Node server parses from stdout."""
+    sys.stdout.buffer.write(orjson.dumps(result, option=orjson.OPT_SERIALIZE_NUMPY) + b"\n")
+    sys.stdout.flush()
+
 def main():
     if len(sys.argv) != 4:
         logger.error("Usage: python audio_processor.py <excel_path> <original_name> <job_id>")
@@ -168,11 +372,9 @@ def main():
         # Load frequencies
         frequencies = generator.load_frequencies(excel_path)
         
-        # Convert to list for JSON serialization
-        freq_list = frequencies.tolist()
-        
         # Process frequencies
-        generator.add_frequencies(freq_list)
+        generator.add_frequencies(frequencies)
+        stats = generator.stats
         
         # Generate output filenames
         audio_filename = f"NeuroAudio_{company_name}_{aroma_id}.mp3"
@@ -181,25 +383,54 @@ def main():
         audio_path = os.path.join(output_dir, audio_filename)
         pdf_path = os.path.join(output_dir, pdf_filename)
         
-        # Save audio
-        generator.save_audio(audio_path)
+        # Reuse a previous render of the same frequency set when available
+        cached_audio = os.path.join(Config.CACHE_DIR, f"{generator.cache_key()}.mp3")
+        
+        cache_hit = False
+        if os.path.exists(cached_audio):
+            try:
+                shutil.copy(cached_audio, audio_path)
+                cache_hit = True
+                logger.info(f"Using cached audio: {cached_audio}")
+            except OSError as e:
+                # Another job may have evicted the entry; render it instead
+                logger.warning(f"Could not use cached audio (ignored): {e}")
+        
+        if cache_hit:
+            try:
+                # Mark as recently used for eviction
+                os.utime(cached_audio)
+            except OSError as e:
+                logger.warning(f"Could not refresh cached audio (ignored): {e}")
+        else:
+            # Save audio
+            generator.save_audio(audio_path)
+            
+            try:
+                os.makedirs(Config.CACHE_DIR, exist_ok=True)
+                tmp_path = f"{cached_audio}.{aroma_id}.tmp"
+                shutil.copy(audio_path, tmp_path)
+                os.replace(tmp_path, cached_audio)
+                generator.prune_cache()
+            except OSError as e:
+                logger.warning(f"Could not cache audio (ignored): {e}")
         
         # Generate PDF report
         from pdf_generator import generate_pdf_report
-        generate_pdf_report(freq_list, pdf_filename, aroma_id, company_name, output_dir)
+        generate_pdf_report(frequencies, stats, pdf_filename, aroma_id, company_name, output_dir)
         
         # Output results as JSON
         result = {
-            'frequency_count': len(frequencies),
+            'frequency_count': stats['count'],
             'audio_file': audio_filename,
             'pdf_file': pdf_filename,
-            'frequency_min': float(np.min(frequencies)),
-            'frequency_max': float(np.max(frequencies)),
+            'frequency_min': stats['min'],
+            'frequency_max': stats['max'],
             'aroma_id': aroma_id,
             'company_name': company_name
         }
         
-        print(json.dumps(result))
+        write_result(result)
         
     except Exception as e:
         logger.error(f"Processing failed: {e}")
@@ -207,7 +438,7 @@ def main():
             'error': str(e),
             'status': 'failed'
         }
-        print(json.dumps(error_result))
+        write_result(error_result)
         sys.exit(1)
 
 if __name__ == "__main__":
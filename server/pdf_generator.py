@@ -2,6 +2,7 @@ import os
 import datetime
 import numpy as np
 from fpdf import FPDF
+from fpdf.enums import XPos, YPos
 import logging
 import unicodedata
 
@@ -9,42 +10,41 @@ logger = logging.getLogger(__name__)
 
 def remove_accents(text):
     """Remove accents and special characters from text for PDF compatibility."""
-    if isinstance(text, str):
-        # Normalize unicode characters and remove accents
-        normalized = unicodedata.normalize('NFD', text)
-        ascii_text = normalized.encode('ascii', 'ignore').decode('ascii')
-        # Replace common problematic characters
-        ascii_text = ascii_text.replace('ç', 'c').replace('Ç', 'C')
-        return ascii_text
-    return str(text)
+    text = str(text)
+    # Fast path: most report strings are already plain ASCII
+    if text.isascii():
+        return text
+    # Normalize unicode characters and remove accents
+    normalized = unicodedata.normalize('NFD', text)
+    return normalized.encode('ascii', 'ignore').decode('ascii')
 
-def generate_pdf_report(frequencies, pdf_filename, aroma_id, company_name, output_dir):
-    """Generate a comprehensive PDF report."""
+def generate_pdf_report(frequencies, stats, pdf_filename, aroma_id, company_name, output_dir):
+    """Generate a comprehensive PDF report from the THz array and its precomputed stats."""
     try:
-        if not frequencies or len(frequencies) == 0:
+        if len(frequencies) == 0:
             raise ValueError("No frequencies provided for PDF generation")
             
         pdf = FPDF()
         pdf.add_page()
-        # Use Arial font with latin-1 encoding
-        pdf.set_font("Arial", size=12)
+        # Core Helvetica font with latin-1 encoding
+        pdf.set_font("Helvetica", size=12)
         pdf.set_title(remove_accents("NeuroAudio Technical Report"))
 
         # Header
-        pdf.cell(200, 10, txt="NeuroAudio Technical Report", ln=True, align='C')
+        pdf.cell(200, 10, text="NeuroAudio Technical Report", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
         pdf.ln(10)
 
         # Company logo space
-        pdf.set_font("Arial", size=10)
-        pdf.cell(200, 5, txt="Professional Audio Frequency Processing Platform", ln=True, align='C')
+        pdf.set_font("Helvetica", size=10)
+        pdf.cell(200, 5, text="Professional Audio Frequency Processing Platform", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
         pdf.ln(10)
 
         # Basic Information
-        pdf.set_font("Arial", size=12)
-        pdf.cell(200, 8, txt="PROCESSING SUMMARY", ln=True)
+        pdf.set_font("Helvetica", size=12)
+        pdf.cell(200, 8, text="PROCESSING SUMMARY", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
         pdf.ln(5)
         
-        pdf.set_font("Arial", size=10)
+        pdf.set_font("Helvetica", size=10)
         info_items = [
             f"Company: {remove_accents(company_name)}",
             f"Aroma ID: {remove_accents(aroma_id)}",
@@ -56,20 +56,20 @@ def generate_pdf_report(frequencies, pdf_filename, aroma_id, company_name, outpu
         ]
         
         for item in info_items:
-            pdf.cell(200, 6, txt=remove_accents(item), ln=True)
+            pdf.cell(200, 6, text=remove_accents(item), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
         
         pdf.ln(10)
 
         # Frequency Statistics
-        pdf.set_font("Arial", size=12)
-        pdf.cell(200, 8, txt="FREQUENCY ANALYSIS", ln=True)
+        pdf.set_font("Helvetica", size=12)
+        pdf.cell(200, 8, text="FREQUENCY ANALYSIS", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
         pdf.ln(5)
         
-        pdf.set_font("Arial", size=10)
-        freq_min = float(np.min(frequencies))
-        freq_max = float(np.max(frequencies))
-        freq_mean = float(np.mean(frequencies))
-        freq_std = float(np.std(frequencies))
+        pdf.set_font("Helvetica", size=10)
+        freq_min = stats['min']
+        freq_max = stats['max']
+        freq_mean = stats['mean']
+        freq_std = stats['std']
         
         stats_items = [
             f"Minimum Frequency: {freq_min:.6f} THz",
@@ -80,42 +80,42 @@ def generate_pdf_report(frequencies, pdf_filename, aroma_id, company_name, outpu
         ]
         
         for item in stats_items:
-            pdf.cell(200, 6, txt=item, ln=True)
+            pdf.cell(200, 6, text=item, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
         
         pdf.ln(10)
 
         # Histograma de Frequencias
-        pdf.set_font("Arial", size=12)
-        pdf.cell(200, 8, txt=remove_accents("HISTOGRAMA DE FREQUENCIAS"), ln=True)
+        pdf.set_font("Helvetica", size=12)
+        pdf.cell(200, 8, text=remove_accents("HISTOGRAMA DE FREQUENCIAS"), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
         pdf.ln(5)
         
-        pdf.set_font("Arial", size=8)
-        
         # Criar bins para o histograma
-        freq_array = np.array(frequencies)
-        hist, bin_edges = np.histogram(freq_array, bins=8)
+        hist, bin_edges = np.histogram(frequencies, bins=8)
         
         # Desenhar histograma simples em texto
         max_count = max(hist) if len(hist) > 0 else 1
         
-        for i, (count, start, end) in enumerate(zip(hist, bin_edges[:-1], bin_edges[1:])):
+        ranges = [f"{start:.3f}-{end:.3f} THz" for start, end in zip(bin_edges[:-1], bin_edges[1:])]
+        range_width = max(len(r) for r in ranges)
+        lines = []
+        for count, range_text in zip(hist, ranges):
             # Barra visual usando caracteres ASCII seguros
             bar_length = int((count / max_count) * 30) if max_count > 0 else 0
             bar = "#" * bar_length + "-" * (30 - bar_length)
-            
-            range_text = f"{start:.3f}-{end:.3f} THz"
-            pdf.cell(40, 4, txt=range_text, ln=False)
-            pdf.cell(40, 4, txt=bar, ln=False)
-            pdf.cell(15, 4, txt=f"({count})", ln=True)
+            lines.append(f"{range_text:<{range_width}}  {bar}  ({count})")
+        
+        # Monospaced block so the bars align without per-cell positioning
+        pdf.set_font("Courier", size=8)
+        pdf.multi_cell(0, 4, text="\n".join(lines))
         
         pdf.ln(10)
 
         # Technical Parameters
-        pdf.set_font("Arial", size=12)
-        pdf.cell(200, 8, txt="TECHNICAL PARAMETERS", ln=True)
+        pdf.set_font("Helvetica", size=12)
+        pdf.cell(200, 8, text="TECHNICAL PARAMETERS", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
         pdf.ln(5)
         
-        pdf.set_font("Arial", size=10)
+        pdf.set_font("Helvetica", size=10)
         tech_items = [
             f"Audio Frequency Range: 18.0 - 22.0 kHz",
             f"Volume Level: -10 dB",
@@ -126,32 +126,33 @@ def generate_pdf_report(frequencies, pdf_filename, aroma_id, company_name, outpu
         ]
         
         for item in tech_items:
-            pdf.cell(200, 6, txt=item, ln=True)
+            pdf.cell(200, 6, text=item, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
         
         pdf.ln(10)
 
         # Frequency Sample (first 20)
-        pdf.set_font("Arial", size=12)
-        pdf.cell(200, 8, txt="FREQUENCY SAMPLE (First 20 entries)", ln=True)
+        pdf.set_font("Helvetica", size=12)
+        pdf.cell(200, 8, text="FREQUENCY SAMPLE (First 20 entries)", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
         pdf.ln(5)
         
-        pdf.set_font("Arial", size=8)
         sample_freqs = frequencies[:20]
-        for i, freq in enumerate(sample_freqs, 1):
-            pdf.cell(100, 4, txt=f"{i:2d}. {float(freq):.6f} THz", ln=True if i % 2 == 0 else False)
-            if i % 2 == 1 and i < len(sample_freqs):
-                pdf.cell(0, 4, txt=f"{i+1:2d}. {float(sample_freqs[i]):.6f} THz", ln=True)
+        entries = [f"{i:2d}. {float(freq):.6f} THz" for i, freq in enumerate(sample_freqs, 1)]
+        entry_width = max(len(e) for e in entries)
+        lines = [
+            "    ".join(f"{e:<{entry_width}}" for e in entries[i:i + 2]).rstrip()
+            for i in range(0, len(entries), 2)
+        ]
         
-        if len(sample_freqs) % 2 == 1:
-            pdf.ln(4)
+        pdf.set_font("Courier", size=8)
+        pdf.multi_cell(0, 4, text="\n".join(lines))
         
         pdf.ln(10)
 
         # Footer
         pdf.ln(20)
-        pdf.set_font("Arial", size=8)
-        pdf.cell(200, 4, txt="This report was generated automatically by the NeuroAudio processing system.", ln=True, align='C')
-        pdf.cell(200, 4, txt="For technical support, please contact the development team.", ln=True, align='C')
+        pdf.set_font("Helvetica", size=8)
+        pdf.cell(200, 4, text="This report was generated automatically by the NeuroAudio processing system.", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
+        pdf.cell(200, 4, text="For technical support, please contact the development team.", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
 
         # Save PDF
         pdf_path = os.path.join(output_dir, pdf_filename)